@@ -1,14 +1,67 @@
 import csv
 import os
 import hashlib
+import logging
+import mmap
+import numpy as np
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from text_utils import text_clean, extract_text
+from text_utils import text_clean, iter_text_segments
+
+# Per-file messages go through logging rather than print: print locks and
+# flushes stdout on every call, which adds up to real serial overhead when
+# a scan touches 10^5+ files. At the default WARNING level the hot loops
+# emit nothing at all.
+logger = logging.getLogger(__name__)
+
+# BLAKE3 is ~6-10x faster than SHA256 for fingerprinting thanks to SIMD and
+# internal tree-hash parallelism; collision resistance is still far beyond
+# what file dedup needs. Fall back to SHA256 if the wheel is not installed.
+# NOTE: switching hash functions changes the report keys, so reports are not
+# comparable across versions.
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+
+# Single translate pass for the ASCII fast path: lowercases, and maps the
+# control separators FS-US (\x1c-\x1f) to space. str.split() treats those
+# four as whitespace but bytes.split() does not, so without the mapping
+# the bytes path would diverge from text_clean on such input.
+_ASCII_CLEAN_TABLE = bytes.maketrans(
+    b"\x1c\x1d\x1e\x1f" + bytes(range(ord("A"), ord("Z") + 1)),
+    b"    " + bytes(range(ord("a"), ord("z") + 1)))
+
+
+def _clean_utf8(text):
+    """
+    Cleans a text segment and returns it as UTF-8 bytes.
+
+    For ASCII input (the overwhelming majority of extracted text) the
+    whole transform runs on bytes: encode once, then one translate pass
+    (lowercase plus mapping the \\x1c-\\x1f separators to space, which
+    str.split treats as whitespace but bytes.split does not) and
+    bytes.split/join - all C-level loops that match text_clean's output
+    exactly (NFKD is a no-op on ASCII), while skipping the str-level
+    passes and the second full-size string allocation. Non-ASCII input
+    takes the regular text_clean path.
+
+    Args:
+        text (str): The raw text segment.
+
+    Returns:
+        bytes: The cleaned segment, UTF-8 encoded.
+    """
+    if text.isascii():
+        return b" ".join(text.encode("ascii").translate(_ASCII_CLEAN_TABLE).split())
+    return text_clean(text).encode("utf-8")
 
 
 def hash_text(text):
     """
-    Generates a SHA256 hash based on the content of a text string.
+    Generates a content hash (BLAKE3, or SHA256 fallback) of a text string.
 
     This is used for 'semantic' deduplication, where the text content matters
     more than the file container (e.g., a .docx and .pdf with the same words).
@@ -17,87 +70,274 @@ def hash_text(text):
         text (str): The text content to hash.
 
     Returns:
-        str: A hexadecimal string representing the SHA256 hash.
+        str: A hexadecimal string representing the hash.
+    """
+    clean = _clean_utf8(text)
+    if blake3 is not None:
+        return blake3(clean).hexdigest()
+    return hashlib.sha256(clean).hexdigest()
+
+
+def hash_text_stream(segments):
+    """
+    Incrementally hashes a stream of text segments.
+
+    Each segment (a PDF page, DOCX paragraph, or TXT line) is cleaned and
+    fed into the digest separated by a single space. Because text_clean
+    collapses whitespace runs, this produces the same digest as cleaning
+    and hashing the whole document at once, while peak memory stays at
+    one segment instead of the full text.
+
+    Args:
+        segments: An iterable of raw text segments.
+
+    Returns:
+        str: A hexadecimal string representing the hash.
+    """
+    hasher = blake3() if blake3 is not None else hashlib.sha256()
+    first = True
+    for segment in segments:
+        cleaned = _clean_utf8(segment)
+        if not cleaned:
+            continue
+        if not first:
+            hasher.update(b" ")
+        hasher.update(cleaned)
+        first = False
+    return hasher.hexdigest()
+
+
+def _advise_sequential(f):
     """
-    clean = text_clean(text)
-    return hashlib.sha256(clean.encode("utf-8")).hexdigest()
+    Hints the kernel that the file will be read once, front to back.
+
+    On Linux this raises the readahead window and lets the page cache drop
+    pages behind the read position, so large scans issue fewer, larger disk
+    requests and don't evict the rest of the cache. No-op where
+    posix_fadvise is unavailable (Windows, macOS).
+    """
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
 
+# Canonical leaf size for the SHA256 tree hash. Changing it changes every
+# root digest, so treat it like part of the hash definition.
+_TREE_CHUNK = 16 * 1024 * 1024
+
+
+def _tree_hash_sha256(f, size):
+    """
+    Hashes a large file as a two-level SHA256 tree.
+
+    A single SHA256 stream is inherently sequential (each block depends on
+    the previous state), so one core caps the throughput. Instead, hash
+    fixed 16MB leaves in parallel threads (hashlib releases the GIL for
+    buffers over 2047 bytes) and SHA256 the concatenated leaf digests as
+    the root. Identical files always produce the same root because the
+    leaf size is canonical.
+
+    Args:
+        f: An open binary file object.
+        size (int): The file size in bytes.
 
-def hash_binary(path, block_size=65536):
+    Returns:
+        str: The hex digest of the root hash.
+    """
+    offsets = range(0, size, _TREE_CHUNK)
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(offsets), os.cpu_count())) as pool:
+                leaves = list(pool.map(
+                    lambda off: hashlib.sha256(view[off:off + _TREE_CHUNK]).digest(),
+                    offsets))
+        finally:
+            view.release()
+    return hashlib.sha256(b"".join(leaves)).hexdigest()
+
+
+def hash_binary(path, block_size=1048576):
     """
-    Generates a SHA256 hash based on the binary file content (bit-for-bit).
+    Generates a content hash of the binary file content (bit-for-bit).
 
     Used as a fallback when text extraction fails or is not applicable
     (e.g., images, executables, or scanned PDFs without OCR).
 
+    With blake3 installed, the file is memory-mapped and hashed with an
+    internal SIMD thread pool (update_mmap). Otherwise SHA256 is used:
+    files larger than one tree leaf go through the parallel tree hash, and
+    smaller files are memory-mapped and fed to sha.update in one call, so
+    the read/update loop runs in C with no user-space read buffering at
+    all. Where mmap is unavailable (special files, exotic filesystems) a
+    plain read path takes over.
+
     Args:
         path (str): The file path to read.
-        block_size (int, optional): The chunk size in bytes for reading the file.
-                                    Defaults to 64KB (65536).
+        block_size (int, optional): The chunk size in bytes for the last-resort
+                                    read loop. Defaults to 1MB (1048576).
 
     Returns:
         str | None: The hex digest of the hash, or None if the file could not be read.
     """
-    sha = hashlib.sha256()
     try:
+        if blake3 is not None:
+            return blake3(max_threads=blake3.AUTO).update_mmap(path).hexdigest()
         with open(path, "rb") as f:
-            for block in iter(lambda: f.read(block_size), b""):
-                sha.update(block)
+            _advise_sequential(f)
+            size = os.fstat(f.fileno()).st_size
+            if size > _TREE_CHUNK:
+                return _tree_hash_sha256(f, size)
+            if size == 0:
+                return hashlib.sha256().hexdigest()
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    return hashlib.sha256(mm).hexdigest()
+            except (OSError, ValueError):
+                f.seek(0)  # mmap refused; fall back to plain reads
+            if hasattr(hashlib, "file_digest"):
+                return hashlib.file_digest(f, "sha256").hexdigest()
+            # Pre-3.11 fallback: reuse one buffer instead of allocating per block
+            sha = hashlib.sha256()
+            buffer = memoryview(bytearray(block_size))
+            while n := f.readinto(buffer):
+                sha.update(buffer[:n])
+            return sha.hexdigest()
     except Exception as e:
-        print(f"[WARN] Could not read binary file {path}: {e}")
+        logger.warning("Could not read binary file %s: %s", path, e)
         return None
-    return sha.hexdigest()
 
 
-def hash_file(path):
+def hash_file(path, suffix=None, verbose=False):
     """
     Orchestrates the hashing strategy for a single file.
 
     Implements a hybrid strategy:
-    1. Attempt Semantic Hashing: Try to extract text. If successful, hash the
-       cleaned text. This allows detecting duplicates across different formats
-       (e.g., PDF vs DOCX).
+    1. Attempt Semantic Hashing: Stream the extracted text segment by
+       segment into the digest. This allows detecting duplicates across
+       different formats (e.g., PDF vs DOCX) without ever holding the
+       full document text in memory.
     2. Fallback to Binary Hashing: If text extraction fails (unsupported format
        or parse error), hash the raw file bytes.
 
     Args:
         path (str): The location of the file to hash.
+        suffix (str, optional): The lowercased file extension, when already
+                                known from directory enumeration.
+        verbose (bool, optional): Log a progress line per file. Off by default
+                                  to keep worker processes quiet. Defaults to False.
 
     Returns:
         str: The computed hash digest.
     """
-    print(f"Scanning: {path}")  # Moved print here to see progress
-    text = extract_text(path)
-
-    if text is not None:
-        # It's a supported text document (PDF/DOCX/TXT)
-        return hash_text(text)
+    if verbose:
+        logger.info("Scanning: %s", path)
+    segments = iter_text_segments(path, suffix)
+
+    if segments is not None:
+        # It's a supported text document (PDF/DOCX/TXT). Parse errors can
+        # surface mid-stream, so fall back to binary hashing on failure.
+        try:
+            return hash_text_stream(segments)
+        except Exception as e:
+            logger.warning("Streaming text hash failed for %s: %s", path, e)
 
     # Fallback: It's a binary file or an unreadable PDF
     return hash_binary(path)
 
 
+# Suffixes that go through semantic (text) hashing. These must always be
+# content-hashed: two identical-length PDFs or DOCX can differ byte-wise
+# while carrying the same text, so the size sieve below must not skip them.
+TEXT_SUFFIXES = (".txt", ".pdf", ".docx")
+
+# How much to read from each end of the file for the cheap signature.
+_SIG_BYTES = 65536
+
+
+def _quick_signature(path, size):
+    """
+    Computes a cheap partial-read signature: SHA256 of the first and last
+    64KB of the file. Two different files of the same size almost always
+    diverge in these regions, so this disambiguates size collisions for
+    the cost of at most two small reads instead of a full-file hash.
+
+    Args:
+        path (str): The file path to read.
+        size (int): The file size in bytes (from the earlier stat).
+
+    Returns:
+        str | None: The signature digest, or None if the file could not be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_SIG_BYTES)
+            if size > 2 * _SIG_BYTES:
+                f.seek(-_SIG_BYTES, os.SEEK_END)
+                tail = f.read(_SIG_BYTES)
+            else:
+                tail = b""
+        return hashlib.sha256(head + tail).hexdigest()
+    except Exception as e:
+        logger.warning("Could not read %s for signature: %s", path, e)
+        return None
+
+
 def crawl_directory(root_path):
     """
     Recursively iterates over a directory tree yielding file paths.
 
+    Uses os.scandir directly instead of os.walk + pathlib: DirEntry
+    objects carry the stat result from the directory listing, so each
+    file costs one stat and no Path object allocation. On a large tree
+    that removes millions of allocations and halves the stat calls.
+
     Args:
         root_path (str): The starting directory path.
 
     Yields:
-        Path: A Path object for every file found within the root_path
-              and its subdirectories.
+        tuple: (path, stat) where path is the file path string and stat
+               is the os.stat_result for that file.
     """
-    root = Path(root_path)
-    for dirpath, _, filenames in os.walk(root):
-        for name in filenames:
-            yield Path(dirpath) / name
+    stack = [str(root_path)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    # Guard the per-entry stat separately: a broken
+                    # symlink must skip only itself, not abort the rest
+                    # of the directory listing.
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            yield entry.path, entry.stat()
+                    except OSError as e:
+                        logger.warning("Could not stat %s: %s", entry.path, e)
+        except OSError as e:
+            logger.warning("Could not scan %s: %s", current, e)
 
 
 def find_duplicates(root_paths):
     """
     Scans directories and identifies files that share the same hash.
 
+    Binary files go through a three-stage sieve so unique files never get
+    fully hashed:
+    1. Group by file size (one stat per file). Most files have a unique
+       size, so this alone eliminates the bulk of the hashing work.
+    2. For size collisions, compare a cheap first+last 64KB signature.
+    3. Only surviving candidates get the full content hash.
+
+    Text-extractable files (.txt/.pdf/.docx) skip the sieve and are always
+    semantically hashed, since byte-different containers can hold the same
+    text.
+
     Args:
         root_paths (str | list): A single directory path or a list of directory paths
                                  to scan.
@@ -108,40 +348,95 @@ def find_duplicates(root_paths):
             - Value: A list of file paths (list[str]) associated with that hash.
             Only entries with >1 file path (duplicates) are returned.
     """
-    hash_map = defaultdict(list)
     # if single path is supplied
     if isinstance(root_paths, (str, Path)):
         root_paths = [root_paths]
 
+    # Stage 0: walk the tree once, splitting text files (always hashed)
+    # from binary files (bucketed by size). The crawl already yields the
+    # stat result, so no file is stat'ed twice.
+    text_paths = []
+    by_size = defaultdict(list)
     for rpath in root_paths:
-        for file_path in crawl_directory(rpath):
-            file_hash = hash_file(str(file_path))
+        for path, stat in crawl_directory(rpath):
+            if path.lower().endswith(TEXT_SUFFIXES):
+                text_paths.append(path)
+            else:
+                by_size[stat.st_size].append(path)
+
+    total_binary = sum(len(v) for v in by_size.values())
+
+    # Stage 1: only files whose size collides can possibly be duplicates.
+    size_collisions = [(size, paths) for size, paths in by_size.items() if len(paths) > 1]
+
+    # Stage 2: disambiguate size collisions with the partial-read signature.
+    candidates = []
+    for size, paths in size_collisions:
+        by_sig = defaultdict(list)
+        for path in paths:
+            sig = _quick_signature(path, size)
+            if sig:
+                by_sig[sig].append(path)
+        for sig_paths in by_sig.values():
+            if len(sig_paths) > 1:
+                candidates.extend(sig_paths)
+
+    print(f"Sieved {total_binary} binary files down to {len(candidates)} hash candidates.")
+    print(f"Hashing {len(candidates) + len(text_paths)} files on {os.cpu_count()} cores...")
+
+    # Stage 3: full hashes, farmed out to a process pool. Hashing is
+    # CPU-bound (PDF parsing + SHA256), so this scales near-linearly with
+    # core count. chunksize amortizes pickling overhead. Results go into
+    # two parallel arrays (structure of arrays) instead of a dict of
+    # lists keyed by 64-char strings - grouping then happens in one
+    # vectorized np.unique pass rather than per-file dict churn.
+    hashed_paths = []
+    digests = []
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for path, file_hash in zip(candidates, executor.map(hash_binary, candidates, chunksize=16)):
             if file_hash:
-                hash_map[file_hash].append(str(file_path))
+                hashed_paths.append(path)
+                digests.append(file_hash)
+        for path, file_hash in zip(text_paths, executor.map(hash_file, text_paths, chunksize=16)):
+            if file_hash:
+                hashed_paths.append(path)
+                digests.append(file_hash)
+
+    if not digests:
+        return {}
+
+    # One C-level sort groups every file by digest; only groups with more
+    # than one member survive.
+    digest_arr = np.array(digests, dtype="S64")
+    uniq, inverse, counts = np.unique(digest_arr, return_inverse=True, return_counts=True)
+    order = np.argsort(inverse, kind="stable")
+    boundaries = np.concatenate(([0], np.cumsum(counts)))
 
-    # Filter for hashes that appear more than once
-    return {h: paths for h, paths in hash_map.items() if len(paths) > 1}
+    duplicates = {}
+    for gid in np.where(counts > 1)[0]:
+        members = order[boundaries[gid]:boundaries[gid + 1]]
+        duplicates[uniq[gid].decode("ascii")] = [hashed_paths[i] for i in members]
+    return duplicates
 
 
 def save_to_csv(data: dict, filename="duplicate_report.csv"):
     """
-    Exports the identified duplicates to a CSV file.
+    Exports the identified duplicates to a CSV file, one row per
+    (hash, path) so every member of a duplicate group gets its own line.
 
     Args:
         data (dict): The dictionary of duplicates returned by find_duplicates.
-        filename (str, optional): The intended filename for the report.
-                                  Note: Current implementation writes to '../output.csv'.
+        filename (str, optional): The filename for the report.
 
     Side Effects:
-        Writes a file to the disk at '../output.csv'.
+        Writes the report file to disk.
         Prints success or error messages to stdout.
     """
     try:
-        with open("../output.csv", "w", newline="") as f:
+        with open(filename, "w", newline="", buffering=1 << 20, encoding="utf-8") as f:
             writer = csv.writer(f)
-            writer.writerow(["key", "value"])
-            for key, value in data.items():
-                writer.writerow([key, value])
+            writer.writerow(["hash", "path"])
+            writer.writerows((h, p) for h, paths in data.items() for p in paths)
 
         print(f"\n[SUCCESS] Report saved to: {os.path.abspath(filename)}")
     except Exception as e:
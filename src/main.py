@@ -1,3 +1,5 @@
+import logging
+
 from mixed import main as mixed_main
 from binary_hashing import main as binary_main
 from tfidf import main as tfdif_main
@@ -62,6 +64,9 @@ class FileProcessorGUI:
         messagebox.showinfo("Done", "Processing complete.")
 
 if __name__ == "__main__":
+    # Warnings and errors only: per-file INFO diagnostics stay silent
+    # unless the level is lowered, keeping large scans off the console.
+    logging.basicConfig(level=logging.WARNING)
     root = tk.Tk()
     app = FileProcessorGUI(root)
     root.mainloop()
\ No newline at end of file
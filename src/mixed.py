@@ -1,39 +1,83 @@
-import hashlib
 import os
 import csv
+import logging
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from pathlib import Path
 
+from scipy.sparse import csr_matrix, vstack
+
 # Scikit-learn imports
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 
 # Utils imports
-from text_utils import extract_text, text_clean
+from text_utils import extract_and_clean
+from binary_hashing import hash_binary
 
-def hash_binary(path, block_size=65536):
-    """Hashes the file bit-for-bit."""
-    sha = hashlib.sha256()
-    try:
-        with open(path, "rb") as f:
-            for block in iter(lambda: f.read(block_size), b""):
-                sha.update(block)
-    except Exception as e:
-        print(f"[WARNING] Could not read binary file {path}: {e}")
-        return None
-    return sha.hexdigest()
+# Per-file diagnostics go through logging so the scan loops never pay a
+# stdout lock/flush per file; run-level progress stays on print.
+logger = logging.getLogger(__name__)
+
+
+def _dedup_exact(candidates):
+    """
+    Strips byte-identical files from the text candidates before any
+    parsing happens.
+
+    Renamed exact copies are common in real corpora and there is no point
+    paying PDF extraction plus quadratic TF-IDF scoring to rediscover
+    them. Files are grouped by size first, so hashing only touches files
+    that share a size with at least one other; one representative per
+    digest proceeds to extraction, the rest are reported at score 1.0.
+
+    Args:
+        candidates (list): (path, st_size) pairs for every text candidate.
+
+    Returns:
+        tuple: (unique_paths, exact_results) where exact_results are
+               (path_a, path_b, 1.0) tuples against the kept copy.
+    """
+    by_size = defaultdict(list)
+    for path, size in candidates:
+        by_size[size].append(path)
+
+    unique_paths = []
+    exact_results = []
+    for size, group in by_size.items():
+        if len(group) < 2:
+            unique_paths.extend(group)
+            continue
+        by_digest = defaultdict(list)
+        for path in group:
+            digest = hash_binary(path)
+            if digest:
+                by_digest[digest].append(path)
+            else:
+                # Unreadable now; let extraction report its own failure.
+                unique_paths.append(path)
+        for files in by_digest.values():
+            unique_paths.append(files[0])
+            exact_results.extend((files[0], dup, 1.0) for dup in files[1:])
+
+    if exact_results:
+        print(f"Removed {len(exact_results)} byte-identical text files "
+              "before extraction.")
+    return unique_paths, exact_results
 
 
 def scan_paths(root_paths):
     """
     Generator that recursively walks through one or multiple root directories.
 
+    Built on os.scandir so the stat result from the directory listing is
+    reused instead of paying a second stat (and a Path allocation) per file.
+
     Args:
         root_paths (str | Path | list): A single path or a list of paths to scan.
 
     Yields:
-        Path: Path objects for every file found.
+        tuple: (path, stat) pairs for every file found.
     """
     # Encapsulate single item to list.
     if isinstance(root_paths, (str, Path)):
@@ -41,78 +85,205 @@ def scan_paths(root_paths):
 
     for root in root_paths:
         print(f"Scanning directory: {root}")
-        path_obj = Path(root)
 
         # Check if path exists to avoid crashing on invalid drives
-        if not path_obj.exists():
-            print(f"[WARNING] Path not found: {root}")
+        if not os.path.exists(root):
+            logger.warning("Path not found: %s", root)
             continue
 
-        for dirpath, _, filenames in os.walk(path_obj):
-            for name in filenames:
-                yield Path(dirpath) / name
+        stack = [str(root)]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        # Guard the per-entry stat separately: a broken
+                        # symlink must skip only itself, not abort the
+                        # rest of the directory listing.
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            else:
+                                yield entry.path, entry.stat()
+                        except OSError as e:
+                            logger.warning("Could not stat %s: %s", entry.path, e)
+            except OSError as e:
+                logger.warning("Could not scan %s: %s", current, e)
 
 
 def load_documents(root_paths):
     """
-    Aggregates files from multiple locations and separates them into
-    text-processable and binary categories.
+    Aggregates files from multiple locations, separates them into
+    text-processable and binary categories, and vectorizes the text
+    stream on the fly.
+
+    Extraction results are fed into HashingVectorizer in batches as the
+    worker processes deliver them (the vectorizer is stateless, so
+    batch-wise transform is safe), overlapping parsing with
+    vectorization. The corpus of cleaned strings is never held in memory
+    at once.
 
     Args:
         root_paths (str | list): The directory or directories to process.
 
     Returns:
-        tuple: (text_file_paths, documents, binary_file_paths)
+        tuple: (text_file_paths, counts, binary_file_paths, exact_results)
+               where counts is the stacked sparse term-count matrix
+               aligned with text_file_paths (or None if no text survived
+               filtering) and exact_results are the byte-identical text
+               pairs found by the pre-pass.
     """
     text_file_paths = []
-    documents = []
     binary_file_paths = []
 
-    # Iterating over the generator function to get a flat stream of files
-    for path in scan_paths(root_paths):
-        print(f"Attempting to load {path}")
-        if path.suffix.lower() in ['.txt', '.pdf', '.docx']:
-            raw_text = extract_text(str(path))
-            if raw_text:
-                cleaned = text_clean(raw_text)
-                # Filter out empty or very short files (likely not meaningful content)
-                if len(cleaned) > 50:
-                    text_file_paths.append(str(path))
-                    documents.append(cleaned)
-                else:
-                    pass
-            else:
-                #fallback in case text is corrupted or has a vector image inside
-                binary_file_paths.append(str(path))
+    # Walk first, extract later: splitting the stream up front lets the
+    # expensive extraction fan out over all cores.
+    text_candidates = []
+    for path, stat in scan_paths(root_paths):
+        if path.lower().endswith(('.txt', '.pdf', '.docx')):
+            text_candidates.append((path, stat.st_size))
         else:
             # Add non-text files to binary list for standard hashing
-            binary_file_paths.append(str(path))
+            binary_file_paths.append(path)
+
+    # Exact copies are settled by a cheap O(N) hash pass so they never
+    # reach the parser or the pairwise scoring.
+    text_candidates, exact_results = _dedup_exact(text_candidates)
+
+    print(f"Extracting text from {len(text_candidates)} documents "
+          f"on {os.cpu_count()} cores...")
+
+    # float32 halves the memory and memory bandwidth of every sparse op
+    # downstream; thresholding at 0.9 is nowhere near float32's precision.
+    vectorizer = HashingVectorizer(stop_words=None, n_features=1 << 20,
+                                   alternate_sign=False, norm=None,
+                                   dtype=np.float32)
+    blocks = []
+    batch = []
+
+    # PDF/DOCX parsing is CPU-bound, so a process pool sidesteps the GIL
+    # and scales with core count. chunksize amortizes pickling overhead.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for path, cleaned in executor.map(extract_and_clean, text_candidates, chunksize=8):
+            # Filter out empty or very short files (likely not meaningful content)
+            if len(cleaned) > 50:
+                text_file_paths.append(path)
+                batch.append(cleaned)
+                if len(batch) >= 256:
+                    blocks.append(vectorizer.transform(batch))
+                    batch = []
+            elif not cleaned:
+                #fallback in case text is corrupted or has a vector image inside
+                binary_file_paths.append(path)
+    if batch:
+        blocks.append(vectorizer.transform(batch))
 
-    return text_file_paths, documents, binary_file_paths
+    counts = vstack(blocks) if blocks else None
+    return text_file_paths, counts, binary_file_paths, exact_results
 
 
-def find_duplicates_tfidf(paths, documents, threshold=0.90):
-    """Compares text content using TF-IDF."""
-    n_files = len(documents)
-    if n_files < 2:
+def _simhash_fingerprints(tfidf_matrix):
+    """
+    Compresses each TF-IDF row into a 64-bit SimHash fingerprint.
+
+    Uses random hyperplanes: each of 64 fixed random sign patterns over
+    the feature space is dotted with the row (one sparse matmul for the
+    whole corpus) and the sign of the result becomes one fingerprint bit.
+    Rows with a small cosine angle agree on most bits, so Hamming
+    distance between fingerprints approximates cosine similarity.
+
+    Args:
+        tfidf_matrix: The (n_docs x n_features) sparse TF-IDF matrix.
+
+    Returns:
+        np.ndarray: A uint64 fingerprint per document.
+    """
+    # Only features that actually occur in the corpus need a hyperplane;
+    # with a 2^20-dimensional hashed feature space, materializing sign
+    # patterns for every possible feature would cost hundreds of MB.
+    coo = tfidf_matrix.tocoo()
+    used = np.unique(coo.col)
+    compact = csr_matrix((coo.data, (coo.row, np.searchsorted(used, coo.col))),
+                         shape=(tfidf_matrix.shape[0], used.size))
+    # Seeded so fingerprints are reproducible for a given corpus.
+    rng = np.random.default_rng(0)
+    hyperplanes = rng.integers(0, 2, size=(used.size, 64)).astype(np.float32) * 2 - 1
+    projections = compact @ hyperplanes
+    bits = (np.asarray(projections) > 0).astype(np.uint8)
+    return np.packbits(bits, axis=1).view(np.uint64).ravel()
+
+
+def _candidate_pairs(fingerprints, threshold, block=2048):
+    """
+    Shortlists document pairs whose fingerprints are close in Hamming space.
+
+    The Hamming cutoff is derived from the cosine threshold (expected
+    flipped bits for two vectors at the threshold angle is
+    64 * arccos(threshold) / pi) plus a safety margin, so near-threshold
+    pairs are very unlikely to be dropped. Works in row blocks to keep
+    the comparison matrix small.
+
+    Args:
+        fingerprints (np.ndarray): uint64 SimHash per document.
+        threshold (float): The downstream cosine threshold.
+        block (int, optional): Row block size for the pairwise pass.
+
+    Returns:
+        tuple: (rows, cols) index arrays with rows < cols.
+    """
+    n = fingerprints.size
+    bits = np.unpackbits(fingerprints.view(np.uint8).reshape(n, 8), axis=1)
+    signs = bits.astype(np.float32) * 2 - 1
+    max_hamming = int(np.ceil(64 * np.arccos(min(threshold, 1.0)) / np.pi)) + 4
+    # agreement dot = 64 - 2 * hamming, so the Hamming cutoff becomes a
+    # lower bound on the sign-vector dot product.
+    min_dot = 64 - 2 * max_hamming
+
+    rows, cols = [], []
+    for start in range(0, n, block):
+        agreement = signs[start:start + block] @ signs.T
+        r, c = np.where(agreement >= min_dot)
+        keep = (r + start) < c
+        rows.append(r[keep] + start)
+        cols.append(c[keep])
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+def find_duplicates_tfidf(paths, counts, threshold=0.90):
+    """
+    Compares text content using TF-IDF with a SimHash prefilter.
+
+    Takes the pre-vectorized term counts from load_documents. Instead of
+    materializing the dense n x n cosine matrix, candidate pairs are
+    shortlisted by Hamming distance between 64-bit SimHash fingerprints
+    (a far cheaper pairwise pass), and only the shortlist gets exact
+    cosine scoring on the sparse TF-IDF rows.
+    """
+    if counts is None or len(paths) < 2:
         print("Not enough text files found to compare via TF-IDF.")
         return []
 
-    print(f"Vectorizing {n_files} text documents...")
-    vectorizer = TfidfVectorizer(stop_words=None)
-    tfidf_matrix = vectorizer.fit_transform(documents)
+    print(f"Weighting {len(paths)} text documents...")
+    # TfidfTransformer supplies IDF weighting and the L2 normalization
+    # the cosine scoring below relies on. The astype pins the result to
+    # float32 in case the float64 IDF vector upcast it.
+    tfidf_matrix = TfidfTransformer().fit_transform(counts).astype(np.float32)
 
-    print("Calculating Cosine Similarity...")
-    cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
-
-    print(f"Filtering text results > {threshold * 100}%...")
-    duplicates = []
-    rows, cols = np.where(cosine_sim > threshold)
+    print("Prefiltering candidate pairs via SimHash...")
+    fingerprints = _simhash_fingerprints(tfidf_matrix)
+    rows, cols = _candidate_pairs(fingerprints, threshold)
+    if rows.size == 0:
+        return []
 
-    for r, c in zip(rows, cols):
-        if r < c:
-            sim_score = cosine_sim[r, c]
-            duplicates.append((paths[r], paths[c], sim_score))
+    print(f"Scoring {rows.size} candidate pairs > {threshold * 100}%...")
+    # Rows are L2-normalized by TfidfVectorizer, so cosine is a plain dot.
+    scores = np.asarray(tfidf_matrix[rows].multiply(tfidf_matrix[cols]).sum(axis=1)).ravel()
+    mask = scores > threshold
+    duplicates = [
+        (paths[r], paths[c], score)
+        for r, c, score in zip(rows[mask].tolist(), cols[mask].tolist(),
+                               scores[mask].tolist())
+    ]
 
     return duplicates
 
@@ -146,11 +317,13 @@ def find_duplicates_binary(paths):
 
 def save_to_csv(results, filename="duplicate_report.csv"):
     try:
-        with open(filename, mode='w', newline='', encoding='utf-8') as f:
+        with open(filename, mode='w', newline='', buffering=1 << 20, encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(["Similarity Score", "File A", "File B"])
-            for file_a, file_b, score in results:
-                writer.writerow([f"{score:.4f}", file_a, file_b])
+            # writerows drains the iterable in C instead of re-entering
+            # writerow per pair
+            writer.writerows((f"{score:.4f}", file_a, file_b)
+                             for file_a, file_b, score in results)
         print(f"\n[SUCCESS] Report saved to: {os.path.abspath(filename)}")
     except Exception as e:
         print(f"\n[ERROR] Could not save CSV: {e}")
@@ -161,13 +334,13 @@ def main(mounted_drive = "C:/Users"):
 
 
     # 1. Load and sort files
-    text_paths, docs, binary_paths = load_documents(mounted_drive)
+    text_paths, counts, binary_paths, exact_results = load_documents(mounted_drive)
 
-    all_results = []
+    all_results = list(exact_results)
 
     # 2. Process Text Files (TF-IDF)
     if text_paths:
-        text_results = find_duplicates_tfidf(text_paths, docs, threshold=0.90)
+        text_results = find_duplicates_tfidf(text_paths, counts, threshold=0.90)
         all_results.extend(text_results)
 
     # 3. Process Binary Files (Hashing)
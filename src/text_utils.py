@@ -1,19 +1,41 @@
 from pdfminer.converter import PDFConverter
 from pdfminer.high_level import extract_text as pdf_text
-from docx import Document
-from pdfminer.pdfdocument import PDFNoValidXRef, PDFDocument
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LTTextContainer
+from pdfminer.pdfdocument import PDFDocument
 from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
 from pdfminer.pdfpage import PDFPage
-from pdfminer.pdfparser import PDFSyntaxError, PDFParser
+from pdfminer.pdfparser import PDFParser
 from pathlib import Path
+import hashlib
+import mmap
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+import sqlite3
+import threading
 import unicodedata
 import re
 import logging
 import io
 
+# PyMuPDF extracts text with the native MuPDF parser, typically 5-10x
+# faster than pure-Python pdfminer, and releases the GIL while parsing.
+# pdfminer stays as the fallback for files MuPDF rejects (and for when
+# the wheel is not installed).
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
 # Silencing spam from pdfminer
 logging.getLogger("pdfminer").setLevel(logging.CRITICAL)
 
+# Per-file diagnostics go through logging: at the default WARNING level
+# the per-file INFO lines cost nothing, where print would lock and flush
+# stdout once per file.
+logger = logging.getLogger(__name__)
+
 
 class VectorCounter(PDFConverter):
     """
@@ -36,11 +58,37 @@ class VectorCounter(PDFConverter):
     def render_string(self, PDFTextState , PDFTextSeq, PDFColorSpace,PDFGraphicState): pass
 
 
+# Path-painting operators (stroke/fill/clip variants) in a decompressed
+# PDF content stream; whitespace-delimited per the PDF grammar. The
+# trailing check is a lookahead so the separator is not consumed -
+# otherwise non-overlapping matching misses every second operator when
+# ops are one whitespace byte apart.
+_PAINT_OPS_RE = re.compile(rb'(?:^|\s)[SsfFBbn](?=\s|$)')
+
+
 def is_complex_vector_file(path_str, threshold=500):
     """
     Analyzes the first page. If it finds more than 'threshold' vector paths,
     it assumes the file is a CAD drawing/Vector graphic.
+
+    With PyMuPDF available, the first page's content stream is read
+    already-decompressed and the paint operators are counted with a regex
+    - no graphics state machine, no resource loading. The pdfminer
+    interpreter path below remains as the fallback.
     """
+    if fitz is not None:
+        try:
+            with fitz.open(path_str) as doc:
+                if doc.page_count == 0:
+                    return False
+                stream = doc[0].read_contents()
+            count = len(_PAINT_OPS_RE.findall(stream))
+            if count > threshold:
+                logger.info("Detected Vector Drawing (paths: %d): %s", count, path_str)
+                return True
+            return False
+        except Exception:
+            pass  # fall back to the interpreter-based count below
     try:
         with open(path_str, 'rb') as fp:
             parser = PDFParser(fp)
@@ -52,17 +100,20 @@ def is_complex_vector_file(path_str, threshold=500):
             device = VectorCounter(rsrcmgr, outfp)
             interpreter = PDFPageInterpreter(rsrcmgr, device)
 
-            # Only process the first page
-            for page in PDFPage.create_pages(doc):
+            # Only the first page is needed; next() pulls exactly one and
+            # closing the generator stops the Pages-tree walk immediately.
+            pages = PDFPage.create_pages(doc)
+            page = next(pages, None)
+            pages.close()
+            if page is not None:
                 interpreter.process_page(page)
-                break  # One page is enough to know
 
             count = device.vector_ops_count
             device.close()
             outfp.close()
 
             if count > threshold:
-                print(f"[INFO] Detected Vector Drawing (paths: {count}): {path_str}")
+                logger.info("Detected Vector Drawing (paths: %d): %s", count, path_str)
                 return True
 
             return False
@@ -71,46 +122,66 @@ def is_complex_vector_file(path_str, threshold=500):
         return True
 
 
-def is_created_by_cad_software(path):
-    try:
-        with open(path, 'rb') as fp:
-            parser = PDFParser(fp)
-            doc = PDFDocument(parser)
-            # Grabing metadata
-            info = doc.info[0] if doc.info else {}
+# Producer/Creator entries as raw bytes: either a literal string (...) or
+# a hex string <...>. Found by regex so no xref/trailer parsing is needed.
+_PDF_META_RE = re.compile(rb'/(?:Producer|Creator)\s*(?:\(([^)]*)\)|<([0-9A-Fa-f]+)>)')
+_CAD_SIGNATURES_RE = re.compile(rb'autocad|bentley|microstation|revit|bluebeam|graphisoft', re.I)
 
-            def decode_meta(val):
-                """Decodes meta information from bytes."""
-                if isinstance(val, bytes):
-                    return val.decode('utf-8', 'ignore').lower()
-                return str(val).lower()
 
-            producer = decode_meta(info.get('Producer', '')).lower()
-            creator = decode_meta(info.get('Creator', '')).lower()
+def is_created_by_cad_software(path):
+    """
+    Sniffs the PDF Producer/Creator metadata for CAD tool names without
+    parsing the document.
 
-            # If we see these names, we ABORT before reading pages
-            cad_signatures = ['autocad', 'bentley', 'microstation', 'revit', 'bluebeam', 'graphisoft']
+    Building a PDFDocument parses the whole xref table - O(file size)
+    work just to read two info strings. Reading the first 1KB and last
+    4KB raw and regexing for /Producer and /Creator finds the Info
+    dictionary in the vast majority of PDFs for two small reads. Files
+    whose metadata lives elsewhere simply fall through to the vector
+    count check.
+    """
+    try:
+        with open(path, 'rb') as fp:
+            head = fp.read(1024)
+            try:
+                fp.seek(-4096, os.SEEK_END)
+            except OSError:
+                fp.seek(0)  # file shorter than the tail window
+            tail = fp.read(4096)
 
-            if any(sig in producer for sig in cad_signatures) or any(sig in creator for sig in cad_signatures):
-                print(f"[INFO] Skipped CAD/Vector PDF: {path}")
+        for match in _PDF_META_RE.finditer(head + tail):
+            literal, hexstr = match.groups()
+            if hexstr is not None:
+                try:
+                    value = bytes.fromhex(hexstr.decode('ascii'))
+                except ValueError:
+                    continue
+            else:
+                value = literal
+            if _CAD_SIGNATURES_RE.search(value):
+                logger.info("Skipped CAD/Vector PDF: %s", path)
                 return True
-            return
+        return False
     # if it's broken this time skip the file
     except Exception:
-        print(f"[WARN] Unable to open and skipping: {path}")
+        logger.warning("Unable to open and skipping: %s", path)
         return True
 
 
-def extract_text(path : Path):
+def extract_text(path : Path, max_pages=None):
     """
     Identifies the file type by extension and attempts to extract its raw text content.
 
-    This function acts as a wrapper for specific file handlers (PDFMiner, python-docx).
+    This function acts as a wrapper for specific file handlers (MuPDF/PDFMiner, docx XML).
     It is designed to fail silently for corrupt files to allow the scanning process
     to continue uninterrupted.
 
     Args:
         path (str | Path): The file path to process.
+        max_pages (int, optional): Cap on PDF pages to extract. Only
+            appropriate for similarity scoring (TF-IDF), where the term
+            distribution saturates after a few dozen pages; content
+            hashing must read everything and leaves this as None.
 
     Returns:
         str | None: The extracted text string if successful. Returns None if:
@@ -119,31 +190,309 @@ def extract_text(path : Path):
             - An exception occurs during parsing.
     """
     path_str = str(path)
+    handler = _HANDLERS.get(os.path.splitext(path_str)[1].lower())
+    if handler is None:
+        return None
     try:
-        if path_str.endswith(".txt"):
-            with open(path_str, "r", errors="ignore", encoding="utf-8") as f:
-                return f.read()
-        if path_str.endswith(".pdf"):
-            try:
-                # Peeking into .pdf file
-                if is_created_by_cad_software(path_str):
-                    return None
-                # Opening file and counting vectors
-                if is_complex_vector_file(path_str):
-                    return None
-                # finnaly there were no problems
-                return pdf_text(path_str)
-            except (PDFSyntaxError, PDFNoValidXRef, Exception):
-                return None
-        if path_str.endswith(".docx"):
-            doc = Document(path_str)
-            return "\n".join(p.text for p in doc.paragraphs)
+        return handler(path_str, max_pages)
+    except Exception as e:
+        logger.warning("Failed to extract %s: %s", path_str, e)
+        return None
+
+
+def _txt_text(path_str, max_pages=None):
+    """Reads a .txt file through mmap.
+
+    Decoding straight out of the page cache skips the intermediate
+    buffered-read copy that open().read() makes, so peak memory is the
+    decoded string plus the mapped pages instead of bytes plus string.
+
+    Args:
+        path_str (str): The file path.
+        max_pages: Ignored; accepted for handler-dispatch uniformity.
+    """
+    with open(path_str, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return str(memoryview(mm), "utf-8", "ignore")
+        except (OSError, ValueError):
+            # Empty files (mmap rejects zero length) and exotic
+            # filesystems fall back to a plain read.
+            return f.read().decode("utf-8", "ignore")
+
+
+def _iter_txt_lines(path_str):
+    """Yields a .txt file line by line (words never span a boundary)."""
+    with open(path_str, "r", errors="ignore", encoding="utf-8") as f:
+        yield from f
+
+
+# Page cap used by the TF-IDF loaders: after a few dozen pages the term
+# distribution is saturated for similarity purposes, so a 500-page manual
+# should not dominate extraction wall time. Semantic hashing must keep
+# reading every page and passes no cap.
+TFIDF_MAX_PAGES = 30
+
+
+def _pdf_text(path_str, max_pages=None):
+    """Extracts PDF text, preferring the native MuPDF parser.
+
+    Args:
+        path_str (str): The file path.
+        max_pages (int, optional): Stop after this many pages; None reads all.
+    """
+    if fitz is not None:
+        try:
+            with fitz.open(path_str) as doc:
+                parts = []
+                for i, page in enumerate(doc):
+                    if max_pages is not None and i >= max_pages:
+                        break
+                    parts.append(page.get_text("text"))
+                return "\n".join(parts)
+        except (fitz.FileDataError, RuntimeError, ValueError):
+            pass  # let pdfminer have a go at files MuPDF rejects
+    return pdf_text(path_str, maxpages=max_pages or 0)
+
+
+def _iter_pdf_pages(path_str):
+    """Yields the text of each PDF page as it is parsed."""
+    doc = None
+    if fitz is not None:
+        try:
+            doc = fitz.open(path_str)
+        except (fitz.FileDataError, RuntimeError, ValueError):
+            doc = None  # let pdfminer have a go below
+    if doc is not None:
+        # Only the open falls back; errors after pages have been yielded
+        # propagate to the caller rather than restarting the stream.
+        with doc:
+            for page in doc:
+                yield page.get_text("text")
+        return
+    for page in extract_pages(path_str):
+        yield "".join(el.get_text() for el in page if isinstance(el, LTTextContainer))
+
+
+# WordprocessingML namespace; .docx text lives in <w:t> runs inside <w:p>
+# paragraphs in word/document.xml.
+_DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _iter_docx_paragraphs(path_str):
+    """Yields .docx text paragraph by paragraph.
+
+    Stream-parses word/document.xml with iterparse instead of building
+    python-docx's full object model: dedup only needs the run text, not
+    styles or structure, and one SAX-style pass keeps memory at a single
+    paragraph. Elements are cleared as each paragraph completes so the
+    tree never accumulates.
+    """
+    with zipfile.ZipFile(path_str) as z, z.open("word/document.xml") as f:
+        parts = []
+        for _, el in ET.iterparse(f, events=("end",)):
+            if el.tag == _DOCX_NS + "t":
+                if el.text:
+                    parts.append(el.text)
+            elif el.tag == _DOCX_NS + "p":
+                yield "".join(parts)
+                parts.clear()
+                el.clear()
+
+
+def _docx_text(path_str, max_pages=None):
+    """Extracts .docx text as one string (paragraphs joined by newlines).
+
+    max_pages is ignored; accepted for handler-dispatch uniformity.
+    """
+    return "\n".join(_iter_docx_paragraphs(path_str))
+
+
+def _guarded_pdf_text(path_str, max_pages=None):
+    """PDF handler: runs the CAD/vector pre-checks, then extracts text."""
+    if is_created_by_cad_software(path_str):
+        return None
+    if is_complex_vector_file(path_str):
         return None
+    return _pdf_text(path_str, max_pages)
+
+
+# Suffix -> handler dispatch for extract_text, resolved once at import.
+# Mirrors _STREAMERS below: a dict lookup per file instead of re-testing
+# every suffix, and a new format is one entry plus its handler.
+_HANDLERS = {
+    ".txt": _txt_text,
+    ".pdf": _guarded_pdf_text,
+    ".docx": _docx_text,
+}
+
+
+def _stream_pdf(path_str):
+    """PDF streamer: runs the CAD/vector pre-checks, then yields pages."""
+    if is_created_by_cad_software(path_str):
+        return None
+    if is_complex_vector_file(path_str):
+        return None
+    return _iter_pdf_pages(path_str)
+
+
+# Suffix -> streamer dispatch, resolved once at import. A dict lookup per
+# file replaces the endswith cascade that re-tested every suffix on every
+# call, and adding a new format is one entry here.
+_STREAMERS = {
+    ".txt": _iter_txt_lines,
+    ".pdf": _stream_pdf,
+    ".docx": _iter_docx_paragraphs,
+}
+
+
+def iter_text_segments(path, suffix=None):
+    """
+    Streaming counterpart of extract_text: yields the document's text in
+    natural segments (PDF pages, DOCX paragraphs, TXT lines) instead of
+    one full-size string.
+
+    Hashing consumers can feed segments into an incremental digest, so
+    peak memory stays at one segment instead of three document-sized
+    allocations (raw text, cleaned text, encoded bytes).
+
+    Args:
+        path (str | Path): The file path to process.
+        suffix (str, optional): The lowercased file extension, when the
+            caller already knows it from directory enumeration; saves a
+            second splitext per file.
+
+    Returns:
+        generator | None: A generator of text segments, or None when the
+            file type is unsupported or the PDF pre-checks reject the file
+            (same contract as extract_text). Parse errors surface while
+            iterating, so callers should be ready to fall back mid-stream.
+    """
+    path_str = str(path)
+    if suffix is None:
+        suffix = os.path.splitext(path_str)[1].lower()
+    streamer = _STREAMERS.get(suffix)
+    if streamer is None:
+        return None
+    try:
+        return streamer(path_str)
     except Exception as e:
-        print(f"[WARNING] Failed to extract {path_str}: {e}")
+        logger.warning("Failed to open %s for streaming: %s", path_str, e)
         return None
 
 
+# On-disk cache of cleaned text. PDF/DOCX parsing is pure Python and
+# routinely takes seconds per file, so repeat runs (or the same file under
+# several scan roots) should pay a dict lookup, not a re-parse. Keyed by
+# (mtime_ns, size, path) so edits invalidate automatically.
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "duplicate_crawler")
+
+# sqlite3 connections are bound to their creating thread by default, and
+# the pipelined loader calls extract_clean_cached from a thread pool - a
+# single module-global connection would raise ProgrammingError in every
+# thread but the one that opened it. One lazily opened connection per
+# thread (and per forked worker process) keeps each handle single-owner.
+_cache_local = threading.local()
+
+
+def _text_cache():
+    """Lazily opens this thread's sqlite cache connection.
+
+    The cache file is shared by every thread and worker process, so
+    writers must never sit on a long transaction: WAL mode lets readers
+    proceed alongside the one active writer, synchronous=NORMAL makes
+    per-insert commits cheap (no fsync per commit, only per checkpoint),
+    and the busy timeout covers the brief writer-lock handoffs that
+    remain.
+    """
+    conn = getattr(_cache_local, "conn", None)
+    if conn is None:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(_CACHE_DIR, "text.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, cleaned TEXT)")
+        conn.commit()
+        _cache_local.conn = conn
+    return conn
+
+
+def _cache_key(path, stat, max_pages):
+    """Fixed-width cache key: blake2b over identity and freshness fields.
+
+    max_pages is part of the key so capped (TF-IDF) and uncapped
+    extractions of the same file never share an entry.
+    """
+    return hashlib.blake2b(
+        f"{path}|{stat.st_mtime_ns}|{stat.st_size}|{max_pages}".encode("utf-8"),
+        digest_size=16).hexdigest()
+
+
+def extract_clean_cached(path, max_pages=None):
+    """
+    Returns the cleaned text of a file, backed by the persistent cache.
+
+    Equivalent to text_clean(extract_text(path)), but the result (including
+    a failed extraction, stored as NULL) is remembered on disk. A second
+    run over the same tree skips PDF/DOCX parsing and the cleaning pass
+    entirely.
+
+    Args:
+        path (str): The file path to process.
+        max_pages (int, optional): PDF page cap, forwarded to extract_text
+                                   and folded into the cache key.
+
+    Returns:
+        str | None: The cleaned text, or None if extraction failed
+                    (mirroring extract_text's contract).
+    """
+    key = None
+    try:
+        key = _cache_key(path, os.stat(path), max_pages)
+        row = _text_cache().execute(
+            "SELECT cleaned FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            return row[0]
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Text cache unavailable for %s: %s", path, e)
+
+    raw = extract_text(path, max_pages)
+    cleaned = text_clean(raw) if raw else None
+    if key is not None:
+        try:
+            conn = _text_cache()
+            # Commit immediately: a deferred transaction held across many
+            # inserts would block every other worker's writes against the
+            # shared cache file. With WAL + synchronous=NORMAL this is a
+            # short write-lock handoff, not an fsync per file.
+            conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?)", (key, cleaned))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Could not cache text for %s: %s", path, e)
+    return cleaned
+
+
+def extract_and_clean(path):
+    """
+    Pool-friendly wrapper around extract_clean_cached.
+
+    Returns (path, cleaned) with a failed extraction mapped to an empty
+    string, so ProcessPoolExecutor.map results line up with their inputs
+    and pickle cheaply. pdfminer logging is already silenced at module
+    import, which each worker process runs on spawn. Extraction is capped
+    at TFIDF_MAX_PAGES since this wrapper only feeds similarity scoring.
+
+    Args:
+        path (str): The file path to process.
+
+    Returns:
+        tuple: (path, cleaned_text_or_empty_string)
+    """
+    return path, extract_clean_cached(path, TFIDF_MAX_PAGES) or ""
+
+
 def text_clean(text_data: str) -> str:
     """
         Normalizes raw text data to facilitate fuzzy matching.
@@ -159,14 +508,15 @@ def text_clean(text_data: str) -> str:
 
         Transformations:
             1. Unicode Normalization (NFKD): Decomposes characters (e.g., splits accented
-               characters into base char + combining diacritic).
+               characters into base char + combining diacritic). Skipped for pure-ASCII
+               input, where it is a no-op but still costs a full pass.
             2. Lowercasing: Converts all characters to lowercase.
             3. Whitespace Collapsing: Converts tabs, newlines, and multi-spaces into
-               a single space character.
+               a single space character (split/join runs the whole pass in C,
+               and strips the ends as a side effect).
         """
     if not text_data:
         return ""
-    text_data = unicodedata.normalize("NFKD", text_data)
-    text_data = text_data.lower()
-    text_data = re.sub(r"\s+", " ", text_data)
-    return text_data.strip()
\ No newline at end of file
+    if not text_data.isascii():
+        text_data = unicodedata.normalize("NFKD", text_data)
+    return " ".join(text_data.lower().split())
\ No newline at end of file
@@ -1,12 +1,56 @@
 import os
 import csv
+import logging
+import queue
+import threading
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+from scipy.sparse import triu, vstack
 
 # Scikit-learn imports
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from text_utils import text_clean, extract_text
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from text_utils import TFIDF_MAX_PAGES, extract_and_clean, extract_clean_cached
+
+# Per-file diagnostics go through logging so the scan loops never pay a
+# stdout lock/flush per file; run-level progress stays on print.
+logger = logging.getLogger(__name__)
+
+# MinHash/LSH finds near-duplicate candidates in roughly linear time,
+# where the all-pairs cosine matrix is O(n^2) in both memory and compute
+# and stops scaling past ~20k documents. Optional: without datasketch the
+# exact cosine path below is used.
+try:
+    from datasketch import MinHash, MinHashLSH
+except ImportError:
+    MinHash = MinHashLSH = None
+
+# Word-shingle width and number of MinHash permutations. 5-word shingles
+# with 128 perms is the usual near-dup configuration.
+_SHINGLE_SIZE = 5
+_MINHASH_PERMS = 128
+
+
+def _iter_text_files(root_path):
+    """
+    Yields the paths of all supported text files under root_path.
+
+    Recurses with os.scandir directly and filters on entry.name at
+    enumeration time: one DirEntry per file, no Path objects and no
+    os.walk bookkeeping, which matters on trees with 10^5+ files.
+    """
+    stack = [str(root_path)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(('.txt', '.pdf', '.docx')):
+                        yield entry.path
+        except OSError as e:
+            logger.warning("Could not scan %s: %s", current, e)
 
 
 def load_documents(root_path):
@@ -14,47 +58,199 @@ def load_documents(root_path):
     documents = []
 
     print(f"Scanning directory: {root_path}")
-    root = Path(root_path)
+    candidates = list(_iter_text_files(root_path))
 
-    for dirpath, _, filenames in os.walk(root):
-        for name in filenames:
-            path = Path(dirpath) / name
-            if path.suffix not in ['.txt', '.pdf', '.docx']:
-                continue
-
-            raw_text = extract_text(str(path))
-            if raw_text:
-                cleaned = text_clean(raw_text)
-                if len(cleaned) > 50:
-                    file_paths.append(str(path))
-                    documents.append(cleaned)
+    # Extraction is CPU-bound in the PDF parser, so fan it out over a
+    # process pool instead of pinning one core while the rest sit idle.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for path, cleaned in executor.map(extract_and_clean, candidates, chunksize=8):
+            if len(cleaned) > 50:
+                file_paths.append(path)
+                documents.append(cleaned)
 
     return file_paths, documents
 
 
+# Extraction is I/O- plus parse-bound (fitz releases the GIL), while
+# vectorization burns CPU in sklearn's C code - so the two stages overlap
+# well across threads.
+_EXTRACT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def _vectorize_pipelined(paths_iter, vectorizer, batch_size=256, queue_depth=64):
+    """
+    Overlaps text extraction with vectorization instead of running them
+    as two serial phases.
+
+    A producer thread feeds extraction tasks to a thread pool through a
+    bounded queue (the queue provides backpressure, so a slow vectorizer
+    never piles up unbounded extracted text), while the consumer drains
+    results in batches straight into vectorizer.transform. The full list
+    of cleaned documents is never materialized.
+
+    Args:
+        paths_iter: Iterable of candidate file paths.
+        vectorizer: A stateless vectorizer (HashingVectorizer) whose
+                    transform is safe to call per batch.
+        batch_size (int, optional): Documents per transform call.
+        queue_depth (int, optional): Max in-flight extractions.
+
+    Returns:
+        tuple: (paths, matrix) where matrix is the vertically stacked
+               sparse blocks, or None when no document survived filtering.
+    """
+    results = queue.Queue(maxsize=queue_depth)
+
+    def _produce(pool):
+        for path in paths_iter:
+            # put() blocks when the queue is full - that is the backpressure
+            results.put((path, pool.submit(extract_clean_cached, path, TFIDF_MAX_PAGES)))
+        results.put(None)
+
+    kept_paths = []
+    blocks = []
+    batch = []
+    with ThreadPoolExecutor(max_workers=_EXTRACT_WORKERS) as pool:
+        producer = threading.Thread(target=_produce, args=(pool,), daemon=True)
+        producer.start()
+        while (item := results.get()) is not None:
+            path, future = item
+            cleaned = future.result()
+            if cleaned and len(cleaned) > 50:
+                kept_paths.append(path)
+                batch.append(cleaned)
+                if len(batch) >= batch_size:
+                    blocks.append(vectorizer.transform(batch))
+                    batch = []
+        producer.join()
+    if batch:
+        blocks.append(vectorizer.transform(batch))
+
+    if not blocks:
+        return kept_paths, None
+    return kept_paths, vstack(blocks)
+
+
+def _shingles(doc):
+    """Returns the set of 5-word shingles of a cleaned document."""
+    words = doc.split()
+    if len(words) <= _SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + _SHINGLE_SIZE])
+            for i in range(len(words) - _SHINGLE_SIZE + 1)}
+
+
+def find_duplicates_minhash(paths, documents, threshold=0.90):
+    """
+    Finds near-duplicate documents with MinHash/LSH candidate retrieval
+    and exact TF-IDF cosine rescoring.
+
+    Each document is shingled into 5-word windows and summarized by a
+    128-permutation MinHash; the LSH index then returns candidate pairs
+    in near-linear time instead of scoring all n^2 pairs. Only the
+    candidates are scored with TF-IDF cosine, so reported scores stay on
+    the same scale as the exact cosine path.
+
+    Args:
+        paths (list[str]): File path per document.
+        documents (list[str]): Cleaned document texts.
+        threshold (float, optional): Minimum cosine similarity to report.
+
+    Returns:
+        list: Tuples of (path_a, path_b, cosine_score).
+    """
+    print(f"Indexing {len(documents)} documents with MinHash/LSH...")
+    # The LSH threshold sits slightly below the cosine threshold: Jaccard
+    # understates cosine for near-duplicates, so retrieval is deliberately
+    # a little greedy and the cosine rescoring makes the final call.
+    lsh = MinHashLSH(threshold=max(0.0, threshold - 0.1), num_perm=_MINHASH_PERMS)
+    minhashes = []
+    for i, doc in enumerate(documents):
+        mh = MinHash(num_perm=_MINHASH_PERMS)
+        for s in _shingles(doc):
+            mh.update(s.encode("utf-8"))
+        minhashes.append(mh)
+        lsh.insert(i, mh)
+
+    rows, cols = [], []
+    for i, mh in enumerate(minhashes):
+        for j in lsh.query(mh):
+            if i < j:
+                rows.append(i)
+                cols.append(j)
+    if not rows:
+        return []
+
+    print(f"Rescoring {len(rows)} candidate pairs with TF-IDF cosine...")
+    # float32 halves the matrix footprint; a 0.9 threshold needs nothing
+    # like float64 precision.
+    vectorizer = HashingVectorizer(stop_words='english', n_features=1 << 20,
+                                   alternate_sign=False, norm=None,
+                                   dtype=np.float32)
+    tfidf_matrix = TfidfTransformer().fit_transform(
+        vectorizer.transform(documents)).astype(np.float32)
+    # The cleaned strings (potentially GB across a large corpus) are dead
+    # weight once vectorized; clear them before the scoring pass so peak
+    # RSS tracks the sparse matrix, not matrix plus corpus. clear() frees
+    # the strings even though the caller still holds the list.
+    documents.clear()
+    # Rows are L2-normalized, so cosine is a plain sparse dot per pair.
+    scores = np.asarray(tfidf_matrix[rows].multiply(tfidf_matrix[cols]).sum(axis=1)).ravel()
+    mask = scores > threshold
+    rows = np.asarray(rows)[mask]
+    cols = np.asarray(cols)[mask]
+    return [
+        (paths[r], paths[c], score)
+        for r, c, score in zip(rows.tolist(), cols.tolist(), scores[mask].tolist())
+    ]
+
+
 def find_duplicates_tfidf(root_path, threshold=0.90):
-    paths, documents = load_documents(root_path)
-    n_files = len(documents)
+    # Prefer the near-linear MinHash/LSH path; fall back to exact
+    # all-pairs cosine when datasketch is not installed.
+    if MinHashLSH is not None:
+        paths, documents = load_documents(root_path)
+        if len(documents) < 2:
+            print("Not enough text files found to compare.")
+            return []
+        return find_duplicates_minhash(paths, documents, threshold)
 
-    if n_files < 2:
+    print(f"Scanning directory: {root_path}")
+    # HashingVectorizer is stateless: no vocabulary dict to build or hold,
+    # a fixed feature dimensionality, and a single pass over the corpus.
+    # Being stateless also makes it safe to transform batch by batch while
+    # extraction is still running, so the two stages are pipelined.
+    # float32 halves the memory bandwidth of the similarity matmul below.
+    vectorizer = HashingVectorizer(stop_words='english', n_features=1 << 20,
+                                   alternate_sign=False, norm=None,
+                                   dtype=np.float32)
+    paths, counts = _vectorize_pipelined(_iter_text_files(root_path), vectorizer)
+
+    if counts is None or len(paths) < 2:
         print("Not enough text files found to compare.")
         return []
 
-    print(f"Vectorizing {n_files} documents...")
-    vectorizer = TfidfVectorizer(stop_words='english')
-    tfidf_matrix = vectorizer.fit_transform(documents)
+    print(f"Vectorized {len(paths)} documents.")
+    tfidf_matrix = TfidfTransformer().fit_transform(counts).astype(np.float32)
 
     print("Calculating Cosine Similarity...")
-    cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
+    # Rows are L2-normalized by TfidfTransformer, so cosine similarity is
+    # just the sparse matmul X @ X.T: zero-dominated products are skipped
+    # and no dense n x n matrix is ever materialized. Memory tracks the
+    # number of overlapping pairs, not n^2.
+    sims = tfidf_matrix @ tfidf_matrix.T
 
     print(f"Filtering results > {threshold * 100}%...")
-    duplicates = []
-    rows, cols = np.where(cosine_sim > threshold)
-
-    for r, c in zip(rows, cols):
-        if r < c:
-            sim_score = cosine_sim[r, c]
-            duplicates.append((paths[r], paths[c], sim_score))
+    upper = triu(sims, k=1).tocoo()
+    mask = upper.data > threshold
+    # tolist() converts once in C; zipping the arrays directly would box a
+    # NumPy scalar per element.
+    duplicates = [
+        (paths[r], paths[c], score)
+        for r, c, score in zip(upper.row[mask].tolist(),
+                               upper.col[mask].tolist(),
+                               upper.data[mask].tolist())
+    ]
 
     return duplicates
 
@@ -62,14 +258,14 @@ def find_duplicates_tfidf(root_path, threshold=0.90):
 def save_to_csv(results, filename="duplicate_report.csv"):
     """Exports the list of tuples to a CSV file."""
     try:
-        with open(filename, mode='w', newline='', encoding='utf-8') as f:
+        with open(filename, mode='w', newline='', buffering=1 << 20, encoding='utf-8') as f:
             writer = csv.writer(f)
             # Header
             writer.writerow(["Similarity Score", "File A", "File B"])
 
-            # Data
-            for file_a, file_b, score in results:
-                writer.writerow([f"{score:.4f}", file_a, file_b])
+            # Data - writerows drains the iterable in C
+            writer.writerows((f"{score:.4f}", file_a, file_b)
+                             for file_a, file_b, score in results)
 
         print(f"\n[SUCCESS] Report saved to: {os.path.abspath(filename)}")
     except Exception as e: